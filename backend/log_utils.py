@@ -2,30 +2,59 @@
 
 from __future__ import annotations
 
+import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Union
 
 
 PathLike = Union[str, Path]
 
+STDOUT_MARKER = b"Codex stdout:"
+STDERR_MARKER = b"Codex stderr:"
+PREVIEW_TAIL_BYTES = 256 * 1024
+
 
 def extract_stdout_preview(log_path: PathLike) -> str:
-    """Return the most recent Codex stdout section from a log file."""
-    path = Path(log_path)
-    if not path.exists():
-        return ""
+    """Return the most recent Codex stdout section from a log file.
+
+    Results are memoised on the file's mtime and size, so repeated polls of
+    an unchanged log cost a single stat() call.
+    """
+    path = os.fspath(log_path)
     try:
-        log_text = path.read_text(encoding="utf-8")
+        stat = os.stat(path)
     except OSError:
         return ""
+    return _extract_stdout_preview_cached(path, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=256)
+def _extract_stdout_preview_cached(path: str, mtime_ns: int, size: int) -> str:
+    """Scan the log tail for the latest stdout section.
 
-    marker = "Codex stdout:"
-    stderr_marker = "Codex stderr:"
-    idx = log_text.rfind(marker)
+    Logs are append-only, so the latest stdout section sits near the end of
+    the file. Only a tail window is read and searched; the window doubles
+    until the marker is found or the whole file has been scanned.
+    """
+    try:
+        with open(path, "rb") as handle:
+            window = PREVIEW_TAIL_BYTES
+            while True:
+                offset = max(0, size - window)
+                handle.seek(offset)
+                tail = handle.read(size - offset)
+                idx = tail.rfind(STDOUT_MARKER)
+                if idx != -1 or offset == 0:
+                    break
+                window *= 2
+    except OSError:
+        return ""
     if idx == -1:
         return ""
-
-    after = log_text[idx + len(marker) :]
-    if stderr_marker in after:
-        after = after.split(stderr_marker, 1)[0]
-    return after.strip()
+    start = idx + len(STDOUT_MARKER)
+    end = tail.find(STDERR_MARKER, start)
+    section = tail[start:end] if end != -1 else tail[start:]
+    # Match the newline translation Path.read_text applies to the whole log.
+    text = section.decode("utf-8", errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n").strip()
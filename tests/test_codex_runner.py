@@ -0,0 +1,168 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+from server import CodexRunner  # noqa: E402
+
+
+class _RecordingStreamer:
+    def __init__(self) -> None:
+        self.payloads: list[dict] = []
+        self.first_chunk = threading.Event()
+
+    def broadcast_stream(self, payload: dict) -> None:
+        # _pump_output reuses one payload per pipe, so keep a copy.
+        self.payloads.append(dict(payload))
+        self.first_chunk.set()
+
+    def chunks(self, stream: str) -> list[str]:
+        return [payload["chunk"] for payload in self.payloads if payload["stream"] == stream]
+
+
+class PumpOutputTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.streamer = _RecordingStreamer()
+        self.runner = CodexRunner(Path(self.tmpdir.name), self.streamer)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def _spawn(self, script: str) -> subprocess.Popen:
+        return subprocess.Popen(
+            [sys.executable, "-c", textwrap.dedent(script)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+        )
+
+    def _pump(self, process: subprocess.Popen, stdin_data: bytes = b"") -> tuple[list[str], list[str]]:
+        stdout_buffer: list[str] = []
+        stderr_buffer: list[str] = []
+        # Pump from a thread so a regression fails the test instead of hanging it.
+        pump = threading.Thread(
+            target=self.runner._pump_output, args=("p1", process, stdout_buffer, stderr_buffer, stdin_data)
+        )
+        pump.start()
+        pump.join(20)
+        if pump.is_alive():
+            process.kill()
+            self.fail("_pump_output did not return")
+        process.wait(timeout=10)
+        self.assertEqual(self.streamer.chunks("stdout"), stdout_buffer)
+        self.assertEqual(self.streamer.chunks("stderr"), stderr_buffer)
+        return stdout_buffer, stderr_buffer
+
+    def test_stdin_larger_than_pipe_buffer_while_child_prints_first(self) -> None:
+        # The child fills its stdout pipe before reading anything, so writing
+        # the prompt with a blocking write would deadlock.
+        process = self._spawn(
+            """
+            import sys
+            for index in range(4000):
+                sys.stdout.write(f"line {index:04d} " + "x" * 60 + "\\n")
+            sys.stdout.flush()
+            data = sys.stdin.buffer.read()
+            sys.stdout.write(f"read {len(data)} bytes\\n")
+            sys.stderr.write("done\\n")
+            """
+        )
+        stdin_data = b"p" * (1024 * 1024)
+        stdout_buffer, stderr_buffer = self._pump(process, stdin_data)
+        self.assertEqual(len(stdout_buffer), 4001)
+        self.assertEqual(stdout_buffer[0], "line 0000 " + "x" * 60 + "\n")
+        self.assertEqual(stdout_buffer[-1], f"read {len(stdin_data)} bytes\n")
+        self.assertEqual(stderr_buffer, ["done\n"])
+
+    def test_crlf_and_lone_cr_become_newlines_across_reads(self) -> None:
+        process = self._spawn(
+            """
+            import sys, time
+            out = sys.stdout.buffer
+            out.write(b"first\\r\\nsecond\\rthird\\r")
+            out.flush()
+            time.sleep(0.2)
+            out.write(b"\\nfourth")
+            out.flush()
+            """
+        )
+        stdout_buffer, _ = self._pump(process)
+        self.assertEqual(stdout_buffer, ["first\n", "second\n", "third\n", "fourth"])
+
+    def test_multibyte_character_split_across_reads(self) -> None:
+        encoded = "é ✓\n".encode("utf-8")
+        process = self._spawn(
+            f"""
+            import sys, time
+            out = sys.stdout.buffer
+            data = {encoded!r}
+            for index in range(len(data)):
+                out.write(data[index : index + 1])
+                out.flush()
+                time.sleep(0.02)
+            """
+        )
+        stdout_buffer, _ = self._pump(process)
+        self.assertEqual(stdout_buffer, ["é ✓\n"])
+
+    @unittest.skipIf(getattr(os, "pidfd_open", None) is None, "needs pidfd support")
+    def test_background_child_holding_pipes_does_not_block_the_run(self) -> None:
+        process = self._spawn(
+            """
+            import subprocess, sys
+            child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+            print(f"background {child.pid}", flush=True)
+            """
+        )
+        started = time.monotonic()
+        stdout_buffer, _ = self._pump(process)
+        elapsed = time.monotonic() - started
+        background_pid = int(stdout_buffer[0].split()[1])
+        try:
+            os.kill(background_pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.assertEqual(stdout_buffer, [f"background {background_pid}\n"])
+        self.assertLess(elapsed, server.PROCESS_EXIT_DRAIN_SECONDS + 5)
+
+    def test_cancel_during_output_ends_the_run(self) -> None:
+        process = self._spawn(
+            """
+            import sys, time
+            while True:
+                print("tick", flush=True)
+                time.sleep(0.01)
+            """
+        )
+        self.runner.arm_prompt("p1")
+        self.runner._active_process = process
+        results: list[bool] = []
+
+        def _cancel() -> None:
+            self.streamer.first_chunk.wait(5)
+            results.append(self.runner.cancel("p1", "stopped by test"))
+
+        canceller = threading.Thread(target=_cancel)
+        canceller.start()
+        stdout_buffer, _ = self._pump(process)
+        canceller.join(5)
+        self.assertEqual(results, [True])
+        self.assertEqual(process.returncode, -signal.SIGTERM)
+        self.assertTrue(stdout_buffer)
+        self.assertTrue(all(chunk == "tick\n" for chunk in stdout_buffer))
+        self.assertEqual(self.runner._cancel_target, "p1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import log_utils  # noqa: E402
+from log_utils import extract_stdout_preview  # noqa: E402
+
+
+class ExtractStdoutPreviewTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log_path = Path(self.tmpdir.name) / "prompt.log"
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def _write_log(self, text: str) -> Path:
+        self.log_path.write_text(text, encoding="utf-8")
+        return self.log_path
+
+    def test_missing_or_empty_log_returns_empty_preview(self) -> None:
+        self.assertEqual(extract_stdout_preview(self.log_path), "")
+        self.assertEqual(extract_stdout_preview(self._write_log("")), "")
+
+    def test_returns_latest_stdout_section(self) -> None:
+        log_path = self._write_log(
+            "Codex stdout:\nfirst run\n\nCodex stderr:\n<no output>\n"
+            "Codex stdout:\nsecond run ✓\n\nCodex stderr:\nwarning\n"
+        )
+        self.assertEqual(extract_stdout_preview(log_path), "second run ✓")
+
+    def test_stdout_without_stderr_runs_to_end_of_file(self) -> None:
+        log_path = self._write_log("Prompt received at now\n\nCodex stdout:\n  partial output  \n")
+        self.assertEqual(extract_stdout_preview(log_path), "partial output")
+
+    def test_carriage_returns_are_translated_like_read_text(self) -> None:
+        self.log_path.write_bytes("Codex stdout:\r\nline one\r\nline two\rline three ✓\r\n\r\nCodex stderr:\r\n".encode("utf-8"))
+        self.assertEqual(extract_stdout_preview(self.log_path), "line one\nline two\nline three ✓")
+
+    def test_tail_window_grows_until_marker_is_found(self) -> None:
+        log_path = self._write_log("Codex stdout:\nearly result\nCodex stderr:\n" + "x" * 64)
+        original = log_utils.PREVIEW_TAIL_BYTES
+        log_utils.PREVIEW_TAIL_BYTES = 8
+        try:
+            self.assertEqual(extract_stdout_preview(log_path), "early result")
+        finally:
+            log_utils.PREVIEW_TAIL_BYTES = original
+
+    def test_preview_refreshes_when_log_grows(self) -> None:
+        log_path = self._write_log("Codex stdout:\nfirst\n")
+        self.assertEqual(extract_stdout_preview(log_path), "first")
+        with log_path.open("a", encoding="utf-8") as handle:
+            handle.write("Codex stderr:\n\nCodex stdout:\nsecond\n")
+        self.assertEqual(extract_stdout_preview(log_path), "second")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+from server import _extract_stdout_summary, _split_inline_scope_list, parse_prompt_attempts  # noqa: E402
+
+
+def _attempt(received_at: str, stdout: str, status: str = "completed") -> str:
+    return (
+        f"Prompt received at {received_at}\n"
+        "---\n"
+        "Fix the widget\n"
+        "\n"
+        "Context provided to Codex:\n"
+        "Project focus: demo\n"
+        "\n"
+        f"Codex stdout:\n{stdout}\n"
+        "\n"
+        "Codex stderr:\n<no output>\n"
+        f"Attempt status: {status}\n"
+        f"Attempt completed at {received_at}\n"
+        "Elapsed seconds 1.250\n"
+    )
+
+
+class ParsePromptAttemptsTests(unittest.TestCase):
+    def test_splits_sections_for_each_attempt(self) -> None:
+        log_text = _attempt("t1", "first\n\nsecond\n\nthird") + "\n" + _attempt("t2", "retry ok", status="failed")
+        attempts = parse_prompt_attempts(log_text)
+        self.assertEqual([attempt["received_at"] for attempt in attempts], ["t1", "t2"])
+        first = attempts[0]
+        self.assertEqual(first["prompt_text"], "Fix the widget")
+        self.assertEqual(first["context"], "Project focus: demo")
+        self.assertEqual(first["stdout"], "first\n\nsecond\n\nthird")
+        self.assertTrue(first["stderr"].startswith("<no output>"))
+        self.assertEqual(first["summary"], "second\n\nthird")
+        self.assertEqual(first["status"], "completed")
+        self.assertEqual(first["duration_seconds"], 1.25)
+        self.assertEqual(attempts[1]["status"], "failed")
+
+    def test_header_requires_line_start_and_timestamp(self) -> None:
+        log_text = "noise Prompt received at t0\nPrompt received at \nPrompt received at t1\n---\nhello\n"
+        attempts = parse_prompt_attempts(log_text)
+        self.assertEqual([attempt["received_at"] for attempt in attempts], ["t1"])
+        self.assertEqual(attempts[0]["prompt_text"], "hello")
+
+    def test_metadata_line_is_used_when_stdout_is_empty(self) -> None:
+        log_text = "Prompt received at t1\n---\nhi\nContext provided to Codex:\nctx\nCodex stdout:\n\nScope guard blocked the run\n"
+        attempts = parse_prompt_attempts(log_text)
+        self.assertEqual(attempts[0]["stdout"], "Scope guard blocked the run")
+        self.assertEqual(attempts[0]["summary"], "Scope guard blocked the run")
+
+    def test_mapped_parse_matches_text_parse(self) -> None:
+        log_text = _attempt("t1", "ünïcode ✓") + _attempt("t2", "second")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "prompt.log"
+            log_path.write_text(log_text, encoding="utf-8")
+            self.assertEqual(server._parse_prompt_log_mapped(str(log_path)), parse_prompt_attempts(log_text))
+
+            # read_text() translates \r\n and lone \r, so the mapped parse must too.
+            crlf_log = _attempt("t1", "line1\nline2").replace("\n", "\r\n").rstrip("\n") + _attempt("t2", "second")
+            log_path.write_bytes(crlf_log.encode("utf-8"))
+            expected = parse_prompt_attempts(log_path.read_text(encoding="utf-8"))
+            self.assertEqual([attempt["received_at"] for attempt in expected], ["t1", "t2"])
+            self.assertEqual(expected[0]["stdout"], "line1\nline2")
+            self.assertEqual(server._parse_prompt_log_mapped(str(log_path)), expected)
+
+    def test_invalid_utf8_is_replaced_on_both_sides_of_mmap_threshold(self) -> None:
+        filler = "x" * 1023 + "\n"
+        body = (filler * (server.PROMPT_LOG_MMAP_THRESHOLD // len(filler) + 1)).encode("utf-8")
+        large_log = _attempt("t1", "bad \udcff byte").encode("utf-8", "surrogateescape") + body + _attempt("t2", "ok").encode("utf-8")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "prompt.log"
+            log_path.write_bytes(large_log)
+            self.assertGreaterEqual(log_path.stat().st_size, server.PROMPT_LOG_MMAP_THRESHOLD)
+            server._ATTEMPTS_CACHE.clear()
+            _, mapped = server._load_prompt_log(str(log_path), include_text=False)
+            self.assertEqual([attempt["received_at"] for attempt in mapped], ["t1", "t2"])
+            self.assertTrue(mapped[0]["stdout"].startswith("bad \ufffd byte"))
+            # The parse is cached, so polls do not reparse the file.
+            self.assertIs(server._load_prompt_log(str(log_path), include_text=False)[1], mapped)
+
+            server._ATTEMPTS_CACHE.clear()
+            log_text, attempts = server._load_prompt_log(str(log_path), include_text=True)
+            self.assertIn("bad \ufffd byte", log_text)
+            self.assertEqual(attempts, mapped)
+
+            log_path.write_bytes(large_log[: large_log.index(body)])
+            self.assertLess(log_path.stat().st_size, server.PROMPT_LOG_MMAP_THRESHOLD)
+            _, small = server._load_prompt_log(str(log_path), include_text=True)
+            self.assertEqual([attempt["received_at"] for attempt in small], ["t1"])
+            self.assertEqual(small[0]["stdout"], mapped[0]["stdout"])
+
+
+class StdoutSummaryTests(unittest.TestCase):
+    def test_keeps_trailing_paragraphs(self) -> None:
+        self.assertEqual(_extract_stdout_summary("a\n\nb\r\n\r\nc\n\n\n"), "b\n\nc")
+        self.assertEqual(_extract_stdout_summary("a\n\n   \n\nb", paragraph_count=2), "a\n\nb")
+        self.assertEqual(_extract_stdout_summary("a\n\nb\n\nc", paragraph_count=0), "a\n\nb\n\nc")
+
+    def test_single_line_breaks_stay_inside_a_paragraph(self) -> None:
+        self.assertEqual(_extract_stdout_summary("one\ntwo\n\r\rthree", paragraph_count=1), "one\ntwo\n\r\rthree")
+
+
+class InlineScopeListTests(unittest.TestCase):
+    def test_commas_inside_quotes_do_not_split(self) -> None:
+        self.assertEqual(_split_inline_scope_list('a/**, "b,c", \'d\' ,, '), ["a/**", '"b,c"', "'d'"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+
+
+class PromptStoreAgeHeapTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = server.PromptStore(Path(self.tmpdir.name) / "prompts.json")
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_text_edits_do_not_grow_queued_heap(self) -> None:
+        record = self.store.add_prompt("first")
+        for index in range(2000):
+            self.store.update_prompt_text(record.prompt_id, f"edit {index}")
+            self.store.edit_prompt(record.prompt_id, f"other {index}")
+        self.assertEqual(len(self.store._queued_heap), 1)
+        info = self.store.oldest_prompt_info("queued")
+        self.assertEqual(info["prompt_id"], record.prompt_id)
+
+    def test_status_changes_still_reorder_heaps(self) -> None:
+        first = self.store.add_prompt("first")
+        second = self.store.add_prompt("second")
+        self.store.begin_attempt(first.prompt_id)
+        self.assertEqual(self.store.oldest_prompt_info("queued")["prompt_id"], second.prompt_id)
+        self.assertEqual(self.store.oldest_prompt_info("running")["prompt_id"], first.prompt_id)
+
+
+class PromptStoreListCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = server.PromptStore(Path(self.tmpdir.name) / "prompts.json")
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def _listed(self) -> dict:
+        return {item["prompt_id"]: (item["status"], item["text"]) for item in self.store.list_prompts()["items"]}
+
+    def test_every_mutator_invalidates_cached_snapshot(self) -> None:
+        self.assertEqual(self._listed(), {})
+        first = self.store.add_prompt("first")
+        second = self.store.add_prompt("second")
+        self.assertEqual(self._listed(), {first.prompt_id: ("queued", "first"), second.prompt_id: ("queued", "second")})
+
+        self.store.update_prompt_text(first.prompt_id, "first v2")
+        self.assertEqual(self._listed()[first.prompt_id], ("queued", "first v2"))
+        self.store.edit_prompt(first.prompt_id, "first v3")
+        self.assertEqual(self._listed()[first.prompt_id], ("queued", "first v3"))
+
+        self.store.begin_attempt(first.prompt_id)
+        self.assertEqual(self._listed()[first.prompt_id][0], "running")
+        self.store.mark_completed(first.prompt_id, "done")
+        self.assertEqual(self._listed()[first.prompt_id][0], "completed")
+        self.store.retry_prompt(first.prompt_id)
+        self.assertEqual(self._listed()[first.prompt_id][0], "queued")
+        self.store.begin_attempt(first.prompt_id)
+        self.store.mark_failed(first.prompt_id, "boom")
+        self.assertEqual(self._listed()[first.prompt_id][0], "failed")
+        self.store.begin_attempt(second.prompt_id)
+        self.store.mark_canceled(second.prompt_id, "stopped")
+        self.assertEqual(self._listed()[second.prompt_id][0], "canceled")
+
+        self.store.retry_prompt(second.prompt_id)
+        self.store.delete_prompt(second.prompt_id)
+        self.assertEqual(list(self._listed()), [first.prompt_id])
+
+    def test_unchanged_store_reuses_snapshot(self) -> None:
+        self.store.add_prompt("only")
+        self.assertIs(self.store.list_prompts(), self.store.list_prompts())
+
+
+class PromptStorePersistenceTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / "prompts.json"
+        self.store = server.PromptStore(self.db_path)
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def _wait_for_writer(self, timeout: float = 5.0) -> bool:
+        with self.store._epoch_cv:
+            target = self.store._dirty_epoch
+            return self.store._epoch_cv.wait_for(lambda: self.store._persisted_epoch >= target, timeout)
+
+    def test_burst_of_changes_is_coalesced_into_few_writes(self) -> None:
+        writes = []
+        original = server.write_file_atomic
+        with mock.patch.object(server, "write_file_atomic", side_effect=lambda *args: writes.append(original(*args))):
+            for index in range(50):
+                self.store.add_prompt(f"prompt {index}")
+            self.assertEqual(self.store._dirty_epoch, 50)
+            self.assertTrue(self._wait_for_writer())
+        self.assertEqual(self.store._persisted_epoch, 50)
+        self.assertLess(len(writes), 50)
+        self.assertEqual(len(json.loads(self.db_path.read_text(encoding="utf-8"))), 50)
+
+    def test_flush_sync_waits_for_pending_changes_and_store_reloads(self) -> None:
+        first = self.store.add_prompt("first")
+        second = self.store.add_prompt("second")
+        self.store.begin_attempt(first.prompt_id)
+        self.store.mark_completed(first.prompt_id, "done")
+        self.store.edit_prompt(second.prompt_id, "second v2")
+        self.store.flush_sync()
+        self.assertEqual(self.store._persisted_epoch, self.store._dirty_epoch)
+
+        reloaded = server.PromptStore(self.db_path)
+        self.assertEqual(reloaded.get_prompt(first.prompt_id).status, "completed")
+        self.assertEqual(reloaded.get_prompt(second.prompt_id).text, "second v2")
+        self.assertEqual(reloaded.status_counts()["queued"], 1)
+        self.assertEqual(reloaded.next_prompt_id(timeout=0), second.prompt_id)
+        reloaded.close()
+
+    def test_failed_write_is_retried_without_a_new_change(self) -> None:
+        original = server.write_file_atomic
+        failures = [OSError("disk full"), RuntimeError("unexpected")]
+
+        def _flaky_write(*args):
+            if failures:
+                raise failures.pop(0)
+            return original(*args)
+
+        with mock.patch.object(server, "write_file_atomic", side_effect=_flaky_write):
+            with self.assertLogs("agent_backend", level="ERROR") as logs:
+                record = self.store.add_prompt("survives")
+                self.assertTrue(self._wait_for_writer())
+        self.assertEqual(len(logs.records), 2)
+        self.assertTrue(self.store._writer_thread.is_alive())
+        self.assertIn(record.prompt_id, json.loads(self.db_path.read_text(encoding="utf-8")))
+
+
+    def test_close_stops_writer_and_flushes_pending_changes(self) -> None:
+        # A long coalescing window keeps the writer from persisting on its own.
+        with mock.patch.object(server, "PERSIST_COALESCE_SECONDS", 60.0):
+            record = self.store.add_prompt("pending at shutdown")
+            self.store.close()
+        self.assertFalse(self.store._writer_thread.is_alive())
+        self.assertEqual(self.store._persisted_epoch, self.store._dirty_epoch)
+        self.assertIn(record.prompt_id, json.loads(self.db_path.read_text(encoding="utf-8")))
+        self.store.close()
+
+
+class WriteFileAtomicTests(unittest.TestCase):
+    def test_new_file_mode_follows_umask_and_existing_mode_is_kept(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            target = Path(tmpdir) / "prompts.json"
+            previous_umask = os.umask(0o077)
+            try:
+                server.write_file_atomic(target, b"{}\n")
+            finally:
+                os.umask(previous_umask)
+            self.assertEqual(target.stat().st_mode & 0o777, 0o600)
+            target.chmod(0o640)
+            server.write_file_atomic(target, b"[]\n")
+            self.assertEqual(target.stat().st_mode & 0o777, 0o640)
+            self.assertEqual(target.read_bytes(), b"[]\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+import io
+import json
+import logging
+import socket
+import sys
+import threading
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+from server import WebSocketConnection, WebSocketManager, _build_text_frame, _encode_event, _unmask, _websocket_accept  # noqa: E402
+
+
+def _masked_frame(opcode: int, payload: bytes, mask: bytes = b"\x01\x02\x03\x04") -> bytes:
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, 0x80 | length))
+    elif length < (1 << 16):
+        header = bytes((0x80 | opcode, 0x80 | 126)) + length.to_bytes(2, "big")
+    else:
+        header = bytes((0x80 | opcode, 0x80 | 127)) + length.to_bytes(8, "big")
+    return header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+class WebSocketHandshakeTests(unittest.TestCase):
+    def test_accept_matches_rfc_6455_example(self) -> None:
+        self.assertEqual(_websocket_accept("dGhlIHNhbXBsZSBub25jZQ=="), "s3pPLMBiTxaQ9kYGzzhZRbK+xOo=")
+
+
+class EncodeEventTests(unittest.TestCase):
+    def test_matches_encoding_the_whole_envelope(self) -> None:
+        for event_type, payload in (("health", {"ok": True}), ("prompt_stream", {"chunk": "ünïcode ✓\n"})):
+            expected = json.dumps({"type": event_type, "payload": payload}).encode("ascii")
+            self.assertEqual(_encode_event(event_type, payload), expected)
+            self.assertEqual(_encode_event(event_type, payload), expected)
+
+    def test_pong_template_matches_send_json_encoding(self) -> None:
+        timestamp = "2026-01-02T03:04:05.000006+00:00"
+        self.assertEqual(
+            server._PONG_MESSAGE_TEMPLATE % timestamp.encode("ascii"),
+            _encode_event("pong", {"timestamp": timestamp}),
+        )
+
+
+class UnmaskTests(unittest.TestCase):
+    def test_matches_bytewise_xor(self) -> None:
+        mask = b"\x37\xfa\x21\x3d"
+        for length in (0, 1, 3, 4, 5, 63, 64, 65, 1000):
+            payload = (bytes(range(256)) * 4)[:length]
+            expected = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+            self.assertEqual(_unmask(payload, mask), expected)
+
+    def test_rfc_6455_masked_hello(self) -> None:
+        self.assertEqual(_unmask(b"\x7f\x9f\x4d\x51\x58", b"\x37\xfa\x21\x3d"), b"Hello")
+
+
+class FrameTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server_sock, self.client_sock = socket.socketpair()
+        # serve() reads with a timeout; an empty payload must not wait on it.
+        self.server_sock.settimeout(1.0)
+        self.wfile = io.BytesIO()
+        handler = SimpleNamespace(request=self.server_sock, wfile=self.wfile)
+        self.connection = WebSocketConnection(handler, manager=None)
+        self.connection.alive = True
+        self.connection._start_writer()
+
+    def tearDown(self) -> None:
+        self.connection._stop_writer(timeout=5.0)
+        self.server_sock.close()
+        self.client_sock.close()
+
+    def _written(self) -> bytes:
+        """Wait for the writer to drain the outbox and return what it wrote."""
+        self.connection._stop_writer(timeout=5.0)
+        data = self.wfile.getvalue()
+        self.wfile.seek(0)
+        self.wfile.truncate()
+        self.connection._start_writer()
+        return data
+
+    def test_reads_masked_frames_of_every_length_class(self) -> None:
+        for length in (0, 125, 126, 65535, 65536):
+            payload = bytes(i & 0xFF for i in range(length))
+            # Large frames can exceed the socket buffer, so write from a thread.
+            writer = threading.Thread(target=self.client_sock.sendall, args=(_masked_frame(0x2, payload),))
+            writer.start()
+            self.assertEqual(self.connection._read_frame(), (0x2, payload))
+            writer.join()
+
+    def test_coalesced_frames_are_split(self) -> None:
+        self.client_sock.sendall(_masked_frame(0x1, b"one") + _masked_frame(0x9, b"") + _masked_frame(0x1, b"two"))
+        self.assertEqual(self.connection._read_frame(), (0x1, b"one"))
+        self.assertEqual(self.connection._read_frame(), (0x9, b""))
+        self.assertEqual(self.connection._read_frame(), (0x1, b"two"))
+
+    def test_timeout_mid_frame_keeps_partial_bytes(self) -> None:
+        frame = _masked_frame(0x1, b"x" * 300)
+        self.server_sock.settimeout(0.05)
+        self.client_sock.sendall(frame[:10])
+        with self.assertRaises(TimeoutError):
+            self.connection._read_frame()
+        self.client_sock.sendall(frame[10:])
+        self.assertEqual(self.connection._read_frame(), (0x1, b"x" * 300))
+
+    def test_send_frame_headers(self) -> None:
+        for length, header in (
+            (5, b"\x81\x05"),
+            (126, b"\x81\x7e\x00\x7e"),
+            (65535, b"\x81\x7e\xff\xff"),
+        ):
+            payload = b"x" * length
+            self.assertTrue(self.connection.send_raw_text(payload))
+            self.assertEqual(self._written(), header + payload)
+
+    def test_prebuilt_frame_matches_send_raw_text(self) -> None:
+        payload = b'{"type":"health"}' * 20
+        self.assertTrue(self.connection.send_raw_text(payload))
+        direct = self._written()
+        self.assertTrue(self.connection.send_prebuilt_frame(_build_text_frame(payload)))
+        self.assertEqual(self._written(), direct)
+
+    def test_large_frames_are_sent_without_joining(self) -> None:
+        payload = bytes(i & 0xFF for i in range(300_000))
+        expected = b"\x81\x7f" + len(payload).to_bytes(8, "big") + payload
+        received = bytearray()
+
+        def _drain() -> None:
+            while len(received) < len(expected):
+                received.extend(self.client_sock.recv(65536))
+
+        reader = threading.Thread(target=_drain)
+        reader.start()
+        self.assertTrue(self.connection.send_raw_text(payload))
+        reader.join()
+        self.assertEqual(bytes(received), expected)
+        self.assertEqual(self._written(), b"")
+
+    def test_backlogged_client_is_dropped(self) -> None:
+        self.connection._stop_writer(timeout=5.0)
+        frame = _build_text_frame(b"{}")
+        for _ in range(server.WEBSOCKET_MAX_QUEUED_FRAMES):
+            self.assertTrue(self.connection.send_prebuilt_frame(frame))
+        self.assertFalse(self.connection.send_prebuilt_frame(frame))
+        self.assertFalse(self.connection.alive)
+        self.client_sock.settimeout(1.0)
+        self.assertEqual(self.client_sock.recv(1), b"")
+
+    def test_backlogged_client_stops_writer_without_draining_outbox(self) -> None:
+        self.connection._stop_writer(timeout=5.0)
+        # Without a timeout a stalled send can only be ended by the shutdown.
+        self.server_sock.settimeout(None)
+        handler = SimpleNamespace(request=self.server_sock, wfile=self.server_sock.makefile("wb", buffering=0))
+        connection = WebSocketConnection(handler, manager=None)
+        connection.alive = True
+        connection._start_writer()
+        writer = connection._writer
+        # The peer never reads, so the writer soon blocks on a full socket buffer.
+        frame = _build_text_frame(b"x" * 60000)
+        while connection.send_prebuilt_frame(frame):
+            pass
+        writer.join(timeout=2.0)
+        self.assertFalse(writer.is_alive())
+        self.assertGreater(connection._outbox.qsize(), 0)
+        handler.wfile.close()
+
+
+class _RecordingConnection:
+    def __init__(self) -> None:
+        self.alive = True
+        self.user = None
+        self.frames: list[bytes] = []
+
+    def send_prebuilt_frame(self, frame: bytes) -> bool:
+        if not self.alive:
+            return False
+        self.frames.append(frame)
+        return True
+
+
+class BroadcastTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.manager = WebSocketManager(auth_manager=None, logger=logging.getLogger("test-websocket"))
+
+    def test_only_authenticated_clients_receive_broadcasts(self) -> None:
+        anonymous, authed = _RecordingConnection(), _RecordingConnection()
+        self.manager.register(anonymous)
+        self.manager.register(authed)
+        authed.user = object()
+        self.manager._mark_authenticated(authed)
+        self.manager.broadcast("health", {"ok": True})
+        self.assertEqual(anonymous.frames, [])
+        self.assertEqual(authed.frames, [_build_text_frame(b'{"type": "health", "payload": {"ok": true}}')])
+
+    def test_dead_clients_are_dropped(self) -> None:
+        connection = _RecordingConnection()
+        self.manager.register(connection)
+        connection.user = object()
+        self.manager._mark_authenticated(connection)
+        connection.alive = False
+        self.manager.broadcast("health", {})
+        self.assertEqual(self.manager._snapshot, ())
+        self.manager._mark_authenticated(connection)
+        self.assertEqual(self.manager._snapshot, ())
+
+
+if __name__ == "__main__":
+    unittest.main()